@@ -11,16 +11,34 @@ Created on Sun Nov  9 22:44:40 2025
 # analyzer.py
 
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import pandas as pd
 import os
 
-DATABASE_NAME = 'finance.db'
+from finance_db import get_database_path, list_households
 
-def get_db_connection():
-    """Returns a connection object to the finance database."""
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pyarrow ships with streamlit; only the 'arrow' engine needs it
+    pa = None
+
+# Result engine used by the fetch_* functions: 'pandas' (pd.read_sql_query) or
+# 'arrow' (typed columnar buffers). Override with the FINANCE_RESULT_ENGINE variable.
+RESULT_ENGINE = os.environ.get('FINANCE_RESULT_ENGINE', 'pandas')
+
+# Arrow engine settings: rows fetched per batch, low-cardinality text columns
+# that are dictionary encoded, and date columns with the formats they are stored in
+# (MM/DD/YYYY from enter_data.py, ISO from create_database.insert_sample_data).
+ARROW_BATCH_SIZE = 65536
+CATEGORICAL_COLUMNS = ('category', 'flow')
+DATE_COLUMNS = {'date': ('%m/%d/%Y', '%Y-%m-%d')}
+
+def get_db_connection(household=None):
+    """Returns a connection object to the finance database of a household (default: finance.db)."""
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
+        conn = sqlite3.connect(get_database_path(household))
         # Allows accessing columns by name instead of index
         conn.row_factory = sqlite3.Row 
         return conn
@@ -28,6 +46,74 @@ def get_db_connection():
         print(f"❌ Error connecting to database: {e}")
         return None
 
+def _fetch_arrow_table(conn, query, params):
+    """
+    Runs a query and builds a typed pyarrow Table one batch at a time.
+
+    This is not a zero-copy fetch: the stdlib sqlite3 module only returns
+    Python row tuples, so each batch is still materialized as Python objects
+    and transposed before it is copied into Arrow buffers. What the engine adds
+    is the typed result (parsed dates, dictionary-encoded categoricals) and a
+    Table that st.dataframe renders without converting from pandas; peak
+    Python memory is bounded by ARROW_BATCH_SIZE rows rather than removed.
+    """
+    cursor = conn.execute(query, params or ())
+    names = [description[0] for description in cursor.description]
+
+    batches = []
+    while True:
+        rows = cursor.fetchmany(ARROW_BATCH_SIZE)
+        if not rows:
+            break
+        columns = [pa.array(column) for column in zip(*rows)]
+        batches.append(pa.table(columns, names=names))
+
+    if not batches:
+        return pa.table({name: pa.array([], type=pa.null()) for name in names})
+
+    table = pa.concat_tables(batches, promote_options='permissive')
+
+    for name, date_formats in DATE_COLUMNS.items():
+        if name in names and pa.types.is_string(table[name].type):
+            # Try each format in turn; values no format matches stay null for now
+            parsed = None
+            for date_format in date_formats:
+                attempt = pc.strptime(table[name], format=date_format, unit='s', error_is_null=True)
+                parsed = attempt if parsed is None else pc.coalesce(parsed, attempt)
+            # Keep the original strings rather than drop values that could not be parsed
+            if parsed.null_count == table[name].null_count:
+                table = table.set_column(names.index(name), name, parsed.cast(pa.date32()))
+
+    for name in CATEGORICAL_COLUMNS:
+        if name in names and pa.types.is_string(table[name].type):
+            table = table.set_column(names.index(name), name, pc.dictionary_encode(table[name]))
+
+    return table
+
+
+def read_query(conn, query, params=None, engine=None, as_arrow=False):
+    """
+    Runs a SELECT query with the configured result engine.
+
+    Args:
+        conn (sqlite3.Connection): Active database connection.
+        query (str): SQL query to run.
+        params (list | tuple): Bound query parameters.
+        engine (str): 'pandas' or 'arrow'; defaults to RESULT_ENGINE.
+        as_arrow (bool): Return the pyarrow Table itself (arrow engine only),
+                         e.g. to hand it straight to st.dataframe.
+
+    Returns:
+        pd.DataFrame | pyarrow.Table: Query results.
+    """
+    engine = engine or RESULT_ENGINE
+    if engine != 'arrow' or pa is None:
+        return pd.read_sql_query(query, conn, params=params)
+
+    table = _fetch_arrow_table(conn, query, params)
+    return table if as_arrow else table.to_pandas()
+
+
 # Modified fetch_financial_summary in analyzer.py
 
 def fetch_financial_summary(conn, year_month=None):
@@ -57,7 +143,7 @@ def fetch_financial_summary(conn, year_month=None):
     query += " GROUP BY dummy_index, flow;" # Group by the new index too
     
     try:
-        df = pd.read_sql_query(query, conn, params=params)
+        df = read_query(conn, query, params=params)
         
         if df.empty:
             # Return a default structure with zero totals
@@ -110,7 +196,7 @@ def fetch_monthly_trends(conn):
     """
     
     try:
-        df = pd.read_sql_query(query, conn)
+        df = read_query(conn, query)
         
         # Check if the resulting DataFrame is empty after filtering
         if df.empty:
@@ -162,7 +248,7 @@ def fetch_category_spending(conn, flow='Expense'):
     """
     
     try:
-        df = pd.read_sql_query(query, conn, params=(flow,))
+        df = read_query(conn, query, params=(flow,))
         return df
         
     except sqlite3.Error as e:
@@ -170,12 +256,16 @@ def fetch_category_spending(conn, flow='Expense'):
         return pd.DataFrame()
 
 
-def fetch_all_transactions(conn, category=None, flow=None, limit=50):
+def fetch_all_transactions(conn, category=None, flow=None, limit=50, as_arrow=False):
     """
     Fetches raw transaction data for display in a table.
 
+    Args:
+        as_arrow (bool): With the 'arrow' result engine, return a pyarrow Table
+                         that Streamlit can render without re-serializing.
+
     Returns:
-        pd.DataFrame: Raw transaction data.
+        pd.DataFrame | pyarrow.Table: Raw transaction data.
     """
     if not conn:
         return pd.DataFrame()
@@ -199,13 +289,164 @@ def fetch_all_transactions(conn, category=None, flow=None, limit=50):
     params.append(limit)
 
     try:
-        df = pd.read_sql_query(query, conn, params=params)
+        df = read_query(conn, query, params=params, as_arrow=as_arrow)
         return df
     except sqlite3.Error as e:
         print(f"❌ Error fetching raw transactions: {e}")
         return pd.DataFrame()
 
 
+def fetch_upcoming_bills(conn, days_ahead=30, today=None):
+    """
+    Lists recurring expenses expected within the next `days_ahead` days,
+    based on the incrementally maintained 'recurring_series' table.
+
+    Returns:
+        pd.DataFrame: DataFrame with columns: Description, Category, Cadence,
+                      Typical Amount, Next Expected.
+    """
+    if not conn:
+        return pd.DataFrame()
+
+    today = today or datetime.now().date()
+    query = """
+    SELECT
+        description AS Description,
+        category AS Category,
+        cadence AS Cadence,
+        ROUND(typical_amount, 2) AS "Typical Amount",
+        next_expected_date AS "Next Expected"
+    FROM recurring_series
+    WHERE flow = 'Expense'
+      AND cadence IS NOT NULL
+      AND next_expected_date BETWEEN ? AND date(?, ?)
+    ORDER BY next_expected_date;
+    """
+    
+    try:
+        return read_query(conn, query, params=(today.isoformat(), today.isoformat(), f'+{days_ahead} days'))
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
+        print(f"❌ Error fetching upcoming bills: {e}")
+        return pd.DataFrame()
+
+
+def fetch_missed_payments(conn, grace_days=3, today=None):
+    """
+    Lists recurring items (bills or income) whose expected date passed more
+    than `grace_days` ago without a matching transaction. Series overdue by
+    more than two cycles are considered ended and left out.
+
+    Returns:
+        pd.DataFrame: DataFrame with columns: Description, Category, Flow,
+                      Cadence, Typical Amount, Expected, Days Overdue.
+    """
+    if not conn:
+        return pd.DataFrame()
+
+    today = today or datetime.now().date()
+    query = """
+    SELECT
+        description AS Description,
+        category AS Category,
+        flow AS Flow,
+        cadence AS Cadence,
+        ROUND(typical_amount, 2) AS "Typical Amount",
+        next_expected_date AS Expected,
+        CAST(julianday(?) - julianday(next_expected_date) AS INTEGER) AS "Days Overdue"
+    FROM recurring_series
+    WHERE cadence IS NOT NULL
+      AND next_expected_date < date(?, ?)
+      -- Series silent for more than two cycles are treated as ended, not missed
+      AND julianday(?) - julianday(next_expected_date) <= 2 * mean_interval_days
+    ORDER BY next_expected_date;
+    """
+    
+    try:
+        return read_query(conn, query, params=(today.isoformat(), today.isoformat(), f'-{grace_days} days', today.isoformat()))
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
+        print(f"❌ Error fetching missed payments: {e}")
+        return pd.DataFrame()
+
+
+def fetch_transaction_anomalies(conn, flow='Expense', limit=20):
+    """
+    Gets the most recent transactions flagged as unusual for their category
+    by the streaming statistics in anomalies.py.
+
+    Args:
+        conn (sqlite3.Connection): Active database connection.
+        flow (str): 'Expense' (default) or 'Income'.
+        limit (int): Maximum number of transactions returned.
+
+    Returns:
+        pd.DataFrame: DataFrame with columns: date, description, category, amount,
+                      Category Average, Category P95, Z-Score.
+    """
+    if not conn:
+        return pd.DataFrame()
+
+    query = """
+    SELECT
+        t.date,
+        t.description,
+        a.category,
+        a.amount,
+        ROUND(a.category_mean, 2) AS "Category Average",
+        ROUND(a.category_p95, 2) AS "Category P95",
+        ROUND(a.z_score, 1) AS "Z-Score"
+    FROM transaction_anomalies a
+    JOIN transactions t ON t.rowid = a.transaction_id
+    WHERE a.is_outlier = 1 AND a.flow = ?
+    ORDER BY a.transaction_id DESC
+    LIMIT ?;
+    """
+    
+    try:
+        return read_query(conn, query, params=(flow, limit))
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
+        print(f"❌ Error fetching transaction anomalies: {e}")
+        return pd.DataFrame()
+
+
+def _fetch_household_summary(household):
+    """Computes one household's summary on its own connection (runs in a worker thread)."""
+    conn = get_db_connection(household)
+    try:
+        summary_df = fetch_financial_summary(conn)
+    finally:
+        if conn:
+            conn.close()
+
+    if summary_df.empty:
+        summary_df = pd.DataFrame({'Income': [0.0], 'Expense': [0.0], 'Net Flow': [0.0]})
+    summary_df.columns.name = None
+    summary_df.insert(0, 'Household', household)
+    return summary_df
+
+
+def fetch_household_summaries(households=None, max_workers=None):
+    """
+    Builds the cross-household summary by computing each household's rollup in
+    parallel against its own database file.
+
+    Args:
+        households (list): Households to include (default: every household found).
+        max_workers (int): Thread pool size (default: one thread per household, up to 8).
+
+    Returns:
+        pd.DataFrame: DataFrame with columns: Household, Income, Expense, Net Flow.
+    """
+    households = list_households() if households is None else households
+    if not households:
+        return pd.DataFrame(columns=['Household', 'Income', 'Expense', 'Net Flow'])
+
+    # sqlite3 releases the GIL while a query runs, so threads overlap the per-file work
+    with ThreadPoolExecutor(max_workers=max_workers or min(8, len(households))) as executor:
+        rollups = list(executor.map(_fetch_household_summary, households))
+
+    return pd.concat(rollups, ignore_index=True)
+
+
 if __name__ == '__main__':
     # --- Example Usage ---
     print("--- Running Analysis Examples ---")
@@ -236,21 +477,20 @@ if __name__ == '__main__':
         db_conn.close()
         print("\n--- Analysis Complete ---")
 
-DATABASE_NAME = 'finance.db'
-
-def export_transactions_to_csv(output_filename='exported_transactions.csv'):
+def export_transactions_to_csv(output_filename='exported_transactions.csv', household=None):
     """
     Connects to the finance database, retrieves all transactions, and saves them
     to a specified CSV file.
     """
-    if not os.path.exists(DATABASE_NAME):
-        print(f"❌ Error: Database file '{DATABASE_NAME}' not found.")
+    database_path = get_database_path(household)
+    if not os.path.exists(database_path):
+        print(f"❌ Error: Database file '{database_path}' not found.")
         return
 
     conn = None
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        print(f"Connecting to database: {DATABASE_NAME}")
+        conn = sqlite3.connect(database_path)
+        print(f"Connecting to database: {database_path}")
 
         # SQL to select all fields from the transactions table
         query = "SELECT * FROM transactions ORDER BY date DESC"
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming anomaly detection on category spending.
+
+Each (flow, category) pair keeps running statistics in the 'category_stats'
+table: count, mean and variance (Welford's algorithm) plus approximate median
+and 95th percentile (P-squared estimator). When a transaction is imported it
+is scored against its category's statistics *before* they absorb it, the
+score is stored in 'transaction_anomalies', and the statistics are updated.
+Every step is O(1) per transaction; history is never re-read. Running this
+script rebuilds both tables from the existing transactions (backfill).
+
+Usage:
+    python anomalies.py
+"""
+
+import json
+import math
+import sqlite3
+
+import finance_db # Imported as a module: finance_db calls back into this one on every import
+
+# Quantiles tracked per category
+TRACKED_QUANTILES = (0.5, 0.95)
+
+# A category needs this many earlier transactions before anything is flagged
+MIN_HISTORY = 5
+
+# Transactions at least this many standard deviations from the category mean are outliers
+Z_SCORE_THRESHOLD = 3.0
+
+# Lower bound on the standard deviation, as a fraction of the mean, so categories
+# with identical amounts (e.g. rent) do not flag every small change
+MIN_STD_FRACTION = 0.05
+
+# Rows read per batch when backfilling from the transactions table
+BACKFILL_BATCH_SIZE = 5000
+
+
+def ensure_anomaly_schema(cursor):
+    """Creates the 'category_stats' and 'transaction_anomalies' tables if they do not exist."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS category_stats (
+        flow TEXT NOT NULL,
+        category TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        mean REAL NOT NULL,
+        m2 REAL NOT NULL,                  -- Welford sum of squared deviations
+        quantile_state TEXT NOT NULL,      -- JSON P-squared state per tracked quantile
+        PRIMARY KEY (flow, category)
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS transaction_anomalies (
+        transaction_id INTEGER PRIMARY KEY, -- rowid of the scored transaction
+        flow TEXT NOT NULL,
+        category TEXT NOT NULL,
+        amount REAL NOT NULL,
+        category_mean REAL,
+        category_p95 REAL,
+        z_score REAL,
+        is_outlier INTEGER NOT NULL DEFAULT 0
+    );
+    """)
+
+
+class P2Quantile:
+    """
+    P-squared streaming quantile estimator (Jain & Chlamtac, 1985).
+
+    Tracks one quantile with five markers, so memory and update cost are
+    constant no matter how many values are observed.
+    """
+
+    def __init__(self, p, state=None):
+        self.p = p
+        state = state or {}
+        self.initial = state.get('initial', [])
+        self.q = state.get('q')
+        self.n = state.get('n')
+        self.np = state.get('np')
+        self.dn = state.get('dn')
+
+    def to_dict(self):
+        """Returns the JSON-serializable estimator state."""
+        if self.q is None:
+            return {'initial': self.initial}
+        return {'q': self.q, 'n': self.n, 'np': self.np, 'dn': self.dn}
+
+    def value(self):
+        """Returns the current quantile estimate, or None before the first value."""
+        if self.q is not None:
+            return self.q[2]
+        if not self.initial:
+            return None
+        ordered = sorted(self.initial)
+        return ordered[min(len(ordered) - 1, int(self.p * len(ordered)))]
+
+    def add(self, x):
+        """Adds one observation."""
+        if self.q is None:
+            self.initial.append(x)
+            if len(self.initial) == 5:
+                p = self.p
+                self.q = sorted(self.initial)
+                self.n = [0, 1, 2, 3, 4]
+                self.np = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+                self.dn = [0, p / 2, p, (1 + p) / 2, 1]
+                self.initial = []
+            return
+
+        q, n = self.q, self.n
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.np[i] += self.dn[i]
+
+        # Move the three middle markers towards their desired positions
+        for i in range(1, 4):
+            d = self.np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if q[i - 1] < parabolic < q[i + 1]:
+                    q[i] = parabolic
+                else:
+                    q[i] = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+
+def score_transactions(cursor, transactions):
+    """
+    Scores newly inserted transactions and folds them into their category statistics.
+
+    Runs on the caller's cursor and does not commit, so scores and statistics
+    land in the same transaction as the insert.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor of the importing connection.
+        transactions (list): Tuples of (transaction_id, date, description, category, amount, flow),
+                             in arrival order.
+
+    Returns:
+        int: Number of transactions flagged as outliers.
+    """
+    flagged = 0
+    for transaction_id, _, _, category, amount, flow in transactions:
+        amount = float(amount)
+        cursor.execute(
+            "SELECT count, mean, m2, quantile_state FROM category_stats WHERE flow = ? AND category = ?;",
+            (flow, category)
+        )
+        state = cursor.fetchone()
+        if state is None:
+            count, mean, m2, quantiles = 0, 0.0, 0.0, {}
+        else:
+            count, mean, m2 = state[0], state[1], state[2]
+            quantiles = json.loads(state[3])
+        estimators = {p: P2Quantile(p, quantiles.get(str(p))) for p in TRACKED_QUANTILES}
+
+        # 1. Score against the history seen so far
+        z_score = None
+        is_outlier = False
+        if count >= 2:
+            std = max(math.sqrt(m2 / (count - 1)), abs(mean) * MIN_STD_FRACTION, 0.01)
+            z_score = (amount - mean) / std
+            is_outlier = count >= MIN_HISTORY and abs(z_score) >= Z_SCORE_THRESHOLD
+        flagged += is_outlier
+
+        cursor.execute("""
+            INSERT OR REPLACE INTO transaction_anomalies
+                (transaction_id, flow, category, amount, category_mean, category_p95, z_score, is_outlier)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+        """, (
+            transaction_id, flow, category, amount,
+            mean if count else None, estimators[0.95].value(), z_score, int(is_outlier),
+        ))
+
+        # 2. Welford update and quantile markers
+        count += 1
+        delta = amount - mean
+        mean += delta / count
+        m2 += delta * (amount - mean)
+        for estimator in estimators.values():
+            estimator.add(amount)
+
+        cursor.execute("""
+            INSERT OR REPLACE INTO category_stats (flow, category, count, mean, m2, quantile_state)
+            VALUES (?, ?, ?, ?, ?, ?);
+        """, (flow, category, count, mean, m2, json.dumps({str(p): e.to_dict() for p, e in estimators.items()})))
+
+    return flagged
+
+
+def rebuild_category_stats(household=None):
+    """
+    Backfills 'category_stats' and 'transaction_anomalies' by replaying a
+    household's transaction history in chronological order.
+
+    Args:
+        household (str): Household database to rebuild (default: 'finance.db').
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(finance_db.get_database_path(household))
+        cursor = conn.cursor()
+        ensure_anomaly_schema(cursor)
+        cursor.execute("DELETE FROM category_stats;")
+        cursor.execute("DELETE FROM transaction_anomalies;")
+
+        # MM/DD/YYYY is reordered so the replay follows the real timeline
+        reader = conn.cursor()
+        reader.execute("""
+            SELECT rowid, date, description, category, amount, flow FROM transactions
+            ORDER BY CASE WHEN date LIKE '__/__/____'
+                          THEN substr(date, 7, 4) || '-' || substr(date, 1, 2) || '-' || substr(date, 4, 2)
+                          ELSE date END, rowid;
+        """)
+        flagged = 0
+        while True:
+            batch = reader.fetchmany(BACKFILL_BATCH_SIZE)
+            if not batch:
+                break
+            flagged += score_transactions(cursor, batch)
+
+        conn.commit()
+        print(f"✅ Category statistics rebuilt for {finance_db.get_database_path(household)}: {flagged} outliers flagged.")
+
+    except sqlite3.Error as e:
+        print(f"❌ Database error while rebuilding category statistics: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    for household_name in finance_db.list_households() or [finance_db.DEFAULT_HOUSEHOLD]:
+        rebuild_category_stats(household_name)
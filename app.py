@@ -7,10 +7,16 @@ Created on Sun Nov  9 22:48:29 2025
 
 # app.py
 
+import atexit
+import os
+import threading
+from datetime import date
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from analyzer import get_db_connection, fetch_financial_summary, fetch_monthly_trends, fetch_category_spending, fetch_all_transactions
+from analyzer import get_db_connection, fetch_financial_summary, fetch_monthly_trends, fetch_category_spending, fetch_all_transactions, fetch_household_summaries, fetch_upcoming_bills, fetch_missed_payments, fetch_transaction_anomalies
+from finance_db import DEFAULT_HOUSEHOLD, TransactionWriter, get_database_path, list_households
+from snapshot import get_snapshot_path, load_snapshot, filter_transactions
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(
@@ -19,27 +25,163 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_data
+def get_snapshot(household, snapshot_mtime):
+    """Loads a household's dashboard snapshot once per file version (keyed on its modification time)."""
+    return load_snapshot(household)
+
+def get_household_snapshot(household):
+    """Returns the household's snapshot, or None when it has not been built."""
+    snapshot_path = get_snapshot_path(household)
+    if not os.path.exists(snapshot_path):
+        return None
+    return get_snapshot(household, os.path.getmtime(snapshot_path))
+
+def is_snapshot_stale(household):
+    """Returns True when the household's database (or its WAL) was written after its snapshot was built."""
+    snapshot_mtime = os.path.getmtime(get_snapshot_path(household))
+    database_path = get_database_path(household)
+    return any(
+        os.path.exists(path) and os.path.getmtime(path) > snapshot_mtime
+        for path in (database_path, database_path + '-wal')
+    )
+
+def get_household_options():
+    """Lists households from their database files, or from the default snapshot on a snapshot-only deploy."""
+    households = list_households()
+    if households:
+        return households
+
+    snapshot = get_household_snapshot(DEFAULT_HOUSEHOLD)
+    if snapshot is not None and not snapshot['household_summaries'].empty:
+        return snapshot['household_summaries']['Household'].tolist()
+    return [DEFAULT_HOUSEHOLD]
+
+@st.cache_data(ttl=300)
+def get_household_summaries(household_versions):
+    """
+    Computes the cross-household summary at most once per set of database
+    versions (and every 5 minutes at most), instead of on every rerun.
+
+    Args:
+        household_versions (tuple): (household, database mtime, WAL mtime) entries used as the cache key.
+    """
+    return fetch_household_summaries([household for household, _, _ in household_versions])
+
+def get_household_versions(households):
+    """Returns the cache key for get_household_summaries: each household with its file modification times."""
+    versions = []
+    for household in households:
+        database_path = get_database_path(household)
+        mtimes = [os.path.getmtime(path) if os.path.exists(path) else None for path in (database_path, database_path + '-wal')]
+        versions.append((household, *mtimes))
+    return tuple(versions)
+
+@st.cache_resource
+def get_writer_registry():
+    """Background writers by household, shared by every session of this app process (filled on first submit)."""
+    return {'lock': threading.Lock(), 'writers': {}}
+
+def start_transaction_writer(household):
+    """Returns the household's running writer, starting one (and taking over a stopped writer's unsaved rows) if needed."""
+    registry = get_writer_registry()
+    with registry['lock']:
+        writer = registry['writers'].get(household)
+        if writer is None or not writer.is_alive():
+            previous = writer
+            writer = TransactionWriter(get_database_path(household))
+            atexit.register(writer.stop)
+            registry['writers'][household] = writer
+            if previous is not None and writer.is_alive():
+                for transaction in previous.unsaved:
+                    writer.submit(transaction)
+                previous.unsaved = []
+    return writer
+
+def render_entry_form(household, category_options):
+    """Renders the transaction entry form and queues submissions on the background writer."""
+    st.header("6. Add a Transaction")
+
+    # Entries are only accepted where the household database already exists, so a
+    # snapshot-only deploy never creates database files (which would also change list_households())
+    if not os.path.exists(get_database_path(household)):
+        st.info("This dashboard is served from a snapshot; add transactions on a machine with the household database.")
+        return
+
+    # The writer is started on the first submit, not on every render
+    writer = get_writer_registry()['writers'].get(household)
+    if writer is not None:
+        if not writer.is_alive():
+            st.error(f"The background writer stopped: {writer.last_error}. It will be restarted on the next submit.")
+        if writer.unsaved:
+            st.warning(f"{len(writer.unsaved)} entries could not be saved yet and will be retried: {writer.last_error}")
+        if writer.rejected:
+            rejected_row, error = writer.rejected[-1]
+            st.error(f"{len(writer.rejected)} entries were rejected and not saved (latest: '{rejected_row[1]}': {error}).")
+
+    with st.form("transaction_entry", clear_on_submit=True):
+        col1, col2 = st.columns(2)
+        with col1:
+            entry_date = st.date_input("Date", value=date.today())
+            description = st.text_input("Description")
+            category = st.selectbox("Category", options=category_options + [c for c in ['Other'] if c not in category_options])
+        with col2:
+            amount = st.number_input("Amount ($)", min_value=0.0, step=0.01, format="%.2f")
+            flow = st.radio("Flow Type", options=['Expense', 'Income'], horizontal=True)
+
+        submitted = st.form_submit_button("Add Transaction")
+
+    if submitted:
+        if not description.strip() or amount <= 0:
+            st.warning("Please enter a description and an amount greater than zero.")
+            return
+
+        # Stored in the same MM/DD/YYYY format produced by enter_data.py
+        transaction = (entry_date.strftime('%m/%d/%Y'), description.strip(), category, float(amount), flow)
+        try:
+            writer = start_transaction_writer(household)
+            writer.submit(transaction)
+        except RuntimeError as e:
+            st.error(f"Could not queue '{description.strip()}': {e}")
+            return
+        st.success(f"Queued '{description.strip()}' for saving ({writer.pending()} pending).")
+
 def run_app():
     """Main function to run the Streamlit application."""
     
     st.title("💰 Local Financial Tracker Dashboard")
     st.markdown("---")
 
-    # Get connection and load data
-    conn = get_db_connection()
-    if not conn:
-        st.error("Cannot connect to finance.db. Please ensure the file exists and is accessible.")
-        return
+    # Each household has its own database file and snapshot
+    households = get_household_options()
+    household = households[0]
+    if len(households) > 1:
+        household = st.sidebar.selectbox("Household:", options=households)
+
+    # Prefer the precomputed snapshot (zero SQL); fall back to live queries on the household database
+    snapshot = get_household_snapshot(household)
+    if snapshot is not None and is_snapshot_stale(household):
+        st.warning(f"{get_database_path(household)} has changed since snapshot {snapshot['version']} was built; showing live data. Run `python snapshot.py` to refresh it.")
+        snapshot = None
+    conn = None
+    if snapshot is None:
+        conn = get_db_connection(household)
+        if not conn:
+            st.error(f"Cannot connect to {get_database_path(household)}. Please ensure the file exists and is accessible.")
+            return
+    else:
+        st.caption(f"Serving snapshot {snapshot['version']} (built {snapshot['built_at']}).")
 
     # --- 1. OVERVIEW METRICS (Key Performance Indicators) ---
     st.header("1. Financial Summary Overview")
     
     # Fetch overall summary
-    summary_df = fetch_financial_summary(conn)
+    summary_df = snapshot['summary'] if snapshot else fetch_financial_summary(conn)
 
     if summary_df.empty:
         st.warning("No transaction data found in the database.")
-        conn.close()
+        if conn:
+            conn.close()
         return
 
     # Extract single values for metrics
@@ -64,12 +206,18 @@ def run_app():
         delta_color = "normal" if net_flow >= 0 else "inverse"
         st.metric(label="Net Flow / Savings", value=format_currency(net_flow), delta_color=delta_color)
 
+    # Cross-household comparison (each household's rollup is computed in parallel)
+    if len(households) > 1:
+        st.subheader("All Households")
+        household_df = snapshot['household_summaries'] if snapshot else get_household_summaries(get_household_versions(households))
+        st.dataframe(household_df, use_container_width=True, hide_index=True)
+
     st.markdown("---")
 
     # --- 2. MONTHLY TRENDS (Line Chart) ---
     st.header("2. Monthly Net Flow & Trends")
     
-    monthly_df = fetch_monthly_trends(conn)
+    monthly_df = snapshot['monthly_trends'] if snapshot else fetch_monthly_trends(conn)
     
     if not monthly_df.empty:
         # Create a line chart showing Income and Expense trends
@@ -94,7 +242,7 @@ def run_app():
     st.header("3. Expense Breakdown by Category")
     
     # Fetch category spending
-    category_df = fetch_category_spending(conn, flow='Expense')
+    category_df = snapshot['category_spending'] if snapshot else fetch_category_spending(conn, flow='Expense')
 
     if not category_df.empty:
         # Bar chart for spending
@@ -111,10 +259,37 @@ def run_app():
         fig_cat.update_layout(yaxis={'categoryorder': 'total ascending'})
         st.plotly_chart(fig_cat, use_container_width=True)
 
+    # Transactions scored as outliers against their category's running statistics
+    anomalies_df = snapshot['anomalies'] if snapshot else fetch_transaction_anomalies(conn, flow='Expense')
+
+    if not anomalies_df.empty:
+        st.subheader("⚠️ Unusual Transactions")
+        st.dataframe(anomalies_df, use_container_width=True, hide_index=True)
+
     st.markdown("---")
 
-    # --- 4. RAW DATA TABLE & FILTERING ---
-    st.header("4. Transaction Detail Viewer")
+    # --- 4. RECURRING ITEMS (Upcoming Bills & Missed Payments) ---
+    st.header("4. Upcoming Bills & Missed Payments")
+
+    upcoming_df = snapshot['upcoming_bills'] if snapshot else fetch_upcoming_bills(conn)
+    missed_df = snapshot['missed_payments'] if snapshot else fetch_missed_payments(conn)
+
+    for _, missed in missed_df.iterrows():
+        st.error(
+            f"Missed {missed['Cadence']} {missed['Flow'].lower()}: **{missed['Description']}** "
+            f"({format_currency(missed['Typical Amount'])}) was expected on {missed['Expected']}, "
+            f"{missed['Days Overdue']} days ago."
+        )
+
+    if upcoming_df.empty:
+        st.info("No recurring bills expected in the next 30 days.")
+    else:
+        st.dataframe(upcoming_df, use_container_width=True, hide_index=True)
+
+    st.markdown("---")
+
+    # --- 5. RAW DATA TABLE & FILTERING ---
+    st.header("5. Transaction Detail Viewer")
     
     # Sidebar Filters
     st.sidebar.header("Filter Transactions")
@@ -139,17 +314,34 @@ def run_app():
     filter_flow = selected_flow if selected_flow != 'All' else None
     
     # Fetch filtered data
-    raw_transactions_df = fetch_all_transactions(
-        conn, 
-        category=filter_category, 
-        flow=filter_flow, 
-        limit=limit
-    )
+    if snapshot:
+        raw_transactions_df = filter_transactions(
+            snapshot['transactions'],
+            category=filter_category,
+            flow=filter_flow,
+            limit=limit
+        )
+        st.caption(f"Snapshot mode: filters apply to the {len(snapshot['transactions'])} most recent transactions only.")
+    else:
+        # With the 'arrow' result engine this is a pyarrow Table that st.dataframe renders directly
+        raw_transactions_df = fetch_all_transactions(
+            conn, 
+            category=filter_category, 
+            flow=filter_flow, 
+            limit=limit,
+            as_arrow=True
+        )
 
     st.dataframe(raw_transactions_df, use_container_width=True)
 
+    st.markdown("---")
+
+    # --- 6. DATA ENTRY ---
+    render_entry_form(household, sorted(category_df['category'].tolist() if not category_df.empty else []))
+
     # Close the database connection
-    conn.close()
+    if conn:
+        conn.close()
 
 if __name__ == '__main__':
     run_app()
\ No newline at end of file
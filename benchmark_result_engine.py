@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks the analyzer result engines on a large transaction pull.
+
+Generates a temporary database with BENCHMARK_ROWS synthetic transactions and
+times analyzer.fetch_all_transactions with the 'pandas' engine, the 'arrow'
+engine converted to pandas, and the 'arrow' engine with as_arrow=True (the
+pyarrow Table the Transaction Detail Viewer passes to st.dataframe),
+reporting latency, peak memory and the size of the result.
+
+Both engines read through the stdlib sqlite3 module, which only returns Python
+row tuples, so neither fetch is zero-copy.
+
+Usage:
+    python benchmark_result_engine.py
+"""
+
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import pandas as pd
+
+import analyzer
+
+BENCHMARK_ROWS = 1_000_000
+CATEGORIES = ['Food', 'Housing', 'Utilities', 'Transportation', 'Health', 'Entertainment', 'Education', 'Salary']
+
+
+def create_benchmark_db(path, rows=BENCHMARK_ROWS):
+    """Fills a fresh database file with synthetic transactions in the enter_data.py format."""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE transactions (
+            transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            description TEXT NOT NULL,
+            category TEXT NOT NULL,
+            amount REAL NOT NULL,
+            flow TEXT NOT NULL
+        );
+    """)
+    start = date(2015, 1, 1)
+    rng = random.Random(42)
+
+    def generate():
+        for i in range(rows):
+            day = start + timedelta(days=rng.randrange(3650))
+            category = rng.choice(CATEGORIES)
+            flow = 'Income' if category == 'Salary' else 'Expense'
+            yield (day.strftime('%m/%d/%Y'), f"Transaction {i % 5000}", category, round(rng.uniform(1, 2000), 2), flow)
+
+    conn.executemany(
+        "INSERT INTO transactions (date, description, category, amount, flow) VALUES (?, ?, ?, ?, ?);",
+        generate()
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_engine(path, engine, as_arrow=False, rows=BENCHMARK_ROWS):
+    """
+    Pulls every transaction with one engine and returns
+    (seconds, peak Python bytes, arrow pool bytes, result bytes).
+
+    Latency is measured on its own pass because tracemalloc slows down
+    allocation-heavy code and would distort the comparison.
+    """
+    analyzer.RESULT_ENGINE = engine
+    conn = sqlite3.connect(path)
+
+    started = time.perf_counter()
+    analyzer.fetch_all_transactions(conn, limit=rows, as_arrow=as_arrow)
+    elapsed = time.perf_counter() - started
+
+    pool = analyzer.pa.default_memory_pool() if analyzer.pa is not None else None
+    pool_before = pool.bytes_allocated() if pool else 0
+
+    tracemalloc.start()
+    result = analyzer.fetch_all_transactions(conn, limit=rows, as_arrow=as_arrow)
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    arrow_bytes = (pool.bytes_allocated() - pool_before) if pool else 0
+    if isinstance(result, pd.DataFrame):
+        result_bytes = int(result.memory_usage(deep=True).sum())
+    else:
+        result_bytes = result.nbytes
+    conn.close()
+    return elapsed, python_peak, arrow_bytes, result_bytes
+
+
+def main():
+    """Builds the benchmark database and prints a comparison table."""
+    # (label, engine, as_arrow)
+    engines = [('pandas', 'pandas', False)]
+    if analyzer.pa is not None:
+        engines += [('arrow', 'arrow', False), ('arrow-tbl', 'arrow', True)]
+    if analyzer.pa is None:
+        print("⚠️ pyarrow is not installed: only the 'pandas' engine will be measured.")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'benchmark.db')
+        print(f"Generating {BENCHMARK_ROWS:,} transactions...")
+        create_benchmark_db(path)
+
+        print("\n{:<10} {:>10} {:>16} {:>16} {:>14}".format("Engine", "Seconds", "Python peak MB", "Arrow pool MB", "Result MB"))
+        print("-" * 70)
+        for label, engine, as_arrow in engines:
+            elapsed, python_peak, arrow_bytes, result_bytes = run_engine(path, engine, as_arrow)
+            print("{:<10} {:>10.2f} {:>16.1f} {:>16.1f} {:>14.1f}".format(
+                label, elapsed, python_peak / 1e6, arrow_bytes / 1e6, result_bytes / 1e6))
+
+
+if __name__ == '__main__':
+    main()
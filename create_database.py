@@ -3,20 +3,31 @@
 @author: jaisi
 """
 
+import argparse
+import csv
 import sqlite3
 import os
+import re
+import sys
 from datetime import datetime
 
-Database_File = 'finance.db'
+from finance_db import DATABASE_NAME, get_database_path
+from anomalies import ensure_anomaly_schema
+from recurring import ensure_recurring_schema
 
-def create_table():
+Database_File = DATABASE_NAME
+
+def create_table(household=None):
     """
     Connects to the SQLite database and creates the 'transactions' and 'goals' tables
     if they do not already exist.
     """
     conn = None
     try:
-        conn = sqlite3.connect(Database_File)
+        database_path = get_database_path(household)
+        if os.path.dirname(database_path):
+            os.makedirs(os.path.dirname(database_path), exist_ok=True)
+        conn = sqlite3.connect(database_path)
         cursor = conn.cursor()
         
         # --- 1. Create the Transactions Table (for raw monthly data) ---
@@ -43,6 +54,12 @@ def create_table():
         );
         """
         cursor.execute(goals_table_sql)
+
+        # --- 3. Create the Recurring Series Table (derived state, see recurring.py) ---
+        ensure_recurring_schema(cursor)
+
+        # --- 4. Create the Category Statistics & Anomaly Tables (derived state, see anomalies.py) ---
+        ensure_anomaly_schema(cursor)
         
         conn.commit()
         print("✅ Tables ensured: 'transactions' and 'goals'.")
@@ -54,14 +71,14 @@ def create_table():
             conn.close()
 
 
-def insert_sample_data():
+def insert_sample_data(household=None):
     """
     Inserts a few rows into the transactions and goals tables for demonstration.
     This function is now COMMENTED OUT in the main execution block below.
     """
     conn = None
     try:
-        conn = sqlite3.connect(Database_File)
+        conn = sqlite3.connect(get_database_path(household))
         cursor = conn.cursor()
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -92,20 +109,32 @@ def insert_sample_data():
             conn.close()
 
 
-def delete_all_data():
+def delete_all_data(household=None):
     """
     Deletes ALL rows from the 'transactions' and 'goals' tables.
     This function is now COMMENTED OUT in the main execution block below.
     """
     conn = None
     try:
-        conn = sqlite3.connect(Database_File)
+        conn = sqlite3.connect(get_database_path(household))
         cursor = conn.cursor()
         
         cursor.execute("DELETE FROM transactions;")
         cursor.execute("DELETE FROM goals;")
+        # Derived state is emptied, not dropped, so running writers and open connections keep their tables
+        ensure_recurring_schema(cursor)
+        cursor.execute("DELETE FROM recurring_series;")
+        cursor.execute("DELETE FROM recurring_series_dates;")
+        ensure_anomaly_schema(cursor)
+        cursor.execute("DELETE FROM category_stats;")
+        cursor.execute("DELETE FROM transaction_anomalies;")
 
         conn.commit()
+
+        # Return the freed pages to the OS (effective once maintain_db.py has enabled incremental auto-vacuum)
+        # The pragma frees one page per step and execute() stops after the first step;
+        # executescript() steps it to completion
+        cursor.executescript("PRAGMA incremental_vacuum;")
         
     except sqlite3.Error as e:
         print(f"An error occurred during data deletion: {e}")
@@ -114,42 +143,169 @@ def delete_all_data():
             conn.close()
 
 
-def view_tables_contents(table_name):
+# Operators accepted by --where filters and the SQL they translate to
+WHERE_OPERATORS = {'>=': '>=', '<=': '<=', '!=': '!=', '=': '=', '>': '>', '<': '<', '~': 'LIKE'}
+
+# Column name, then the earliest operator ('>=' before '>'), then the value, which may contain operators
+WHERE_FILTER_PATTERN = re.compile(r'^\s*(\w+)\s*(>=|<=|!=|=|>|<|~)(.*)$', re.DOTALL)
+
+
+def _quote_identifier(name):
+    """Quotes a table or column name for safe use in SQL."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _parse_filters(filters, column_names):
+    """
+    Turns filters such as 'category=Food', 'amount>=100' or 'description~rent'
+    into a WHERE clause with bound parameters.
+
+    Returns:
+        tuple: (where clause or '', list of parameters).
+    """
+    conditions = []
+    params = []
+    for expression in filters or []:
+        match = WHERE_FILTER_PATTERN.match(expression)
+        if not match:
+            raise ValueError(f"Invalid filter '{expression}'. Use column=value, column>=value, column~text, ...")
+
+        column, symbol, value = match.groups()
+        sql_operator = WHERE_OPERATORS[symbol]
+        if column not in column_names:
+            raise ValueError(f"Unknown column '{column}' in filter '{expression}'.")
+        value = value.strip()
+        if sql_operator == 'LIKE':
+            value = f"%{value}%"
+        conditions.append(f"{_quote_identifier(column)} {sql_operator} ?")
+        params.append(value)
+
+    clause = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return clause, params
+
+
+def _approximate_row_count(cursor, table_name):
+    """
+    Estimates the row count without scanning the table.
+
+    Uses the statistics written by ANALYZE (maintain_db.py) in sqlite_stat1.
+    There is no cheap fallback: MAX(rowid) overestimates badly once rows have
+    been deleted, since AUTOINCREMENT never reuses ids.
+
+    Returns:
+        int: Estimated rows, or None when the table has no statistics yet.
+    """
+    try:
+        cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ? LIMIT 1;", (table_name,))
+        stat = cursor.fetchone()
+        if stat and stat[0]:
+            return int(stat[0].split()[0])
+    except sqlite3.Error:
+        pass  # sqlite_stat1 only exists after ANALYZE has run
+    return None
+
+
+def _export_page(export_path, column_names, rows):
+    """Writes one page of rows to a CSV file."""
+    with open(export_path, mode='w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(column_names)
+        writer.writerows(rows)
+    print(f"✅ Exported {len(rows)} rows to '{export_path}'.")
+
+
+def view_tables_contents(table_name, household=None, columns=None, filters=None,
+                         page_size=20, interactive=False, export_path=None):
     """
     Connects to the database and displays the schema and contents of a given table.
+
+    Rows are streamed from a single cursor one page at a time, so tables of any
+    size are inspected in constant memory.
+
+    Args:
+        table_name (str): Table to inspect (must exist in the database).
+        household (str): Household database to open (default: 'finance.db').
+        columns (list): Columns to display (default: all).
+        filters (list): Filters like 'category=Food' or 'amount>=100'; values are bound parameters.
+        page_size (int): Rows per page.
+        interactive (bool): Prompt for further pages instead of showing only the first one.
+        export_path (str): CSV file the current page is written to on request
+                           (or immediately, for the first page, when not interactive).
     """
     conn = None
     try:
-        conn = sqlite3.connect(Database_File)
+        conn = sqlite3.connect(get_database_path(household))
         cursor = conn.cursor()
 
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?;", (table_name,))
+        if cursor.fetchone() is None:
+            print(f"\nTable '{table_name}' does not exist.")
+            return
+
         print(f"\n" + "="*50)
         print(f"VIEWING TABLE: {table_name.upper()}")
         print("="*50)
 
         # 1. Display Schema (Structure)
         print(f"\n--- Schema (Structure of '{table_name}') ---")
-        cursor.execute(f"PRAGMA table_info({table_name});")
+        cursor.execute(f"PRAGMA table_info({_quote_identifier(table_name)});")
         schema = cursor.fetchall()
         
         print("{:<5} {:<20} {:<10} {:<8}".format("ID", "Name", "Type", "PK"))
         print("-" * 45)
         for col in schema:
             print("{:<5} {:<20} {:<10} {:<8}".format(col[0], col[1], col[2], col[5]))
+
+        table_columns = [col[1] for col in schema]
+        selected_columns = columns or table_columns
+        unknown = [column for column in selected_columns if column not in table_columns]
+        if unknown:
+            print(f"\nUnknown column(s) for '{table_name}': {', '.join(unknown)}")
+            return
+        where_clause, params = _parse_filters(filters, table_columns)
+
+        estimate = _approximate_row_count(cursor, table_name)
+        if estimate is None:
+            print("\nApproximate row count: unknown (no statistics yet; run `python maintain_db.py` to collect them)")
+        else:
+            print(f"\nApproximate row count: ~{estimate:,} (from sqlite_stat1)")
         
-        # 2. Display Contents (Actual Data)
+        # 2. Display Contents (Actual Data), one page at a time
         print(f"\n--- Data Contents of '{table_name}' ---")
-        cursor.execute(f"SELECT * FROM {table_name};")
-        rows = cursor.fetchall()
+        query = (
+            f"SELECT {', '.join(_quote_identifier(column) for column in selected_columns)} "
+            f"FROM {_quote_identifier(table_name)}{where_clause} ORDER BY rowid;"
+        )
+        cursor.execute(query, params)
 
-        if not rows:
-            print(f"The '{table_name}' table has 0 rows.")
-        else:
-            column_names = [description[0] for description in cursor.description]
-            print(column_names)
+        page_number = 0
+        while True:
+            rows = cursor.fetchmany(page_size)
+            if not rows:
+                if page_number == 0:
+                    print(f"The '{table_name}' table has 0 matching rows.")
+                break
+
+            page_number += 1
+            print(f"\n[Page {page_number}]")
+            print(selected_columns)
             for row in rows:
                 print(row)
+
+            if not interactive:
+                if export_path:
+                    _export_page(export_path, selected_columns, rows)
+                break
+
+            choice = input("\n[Enter] next page, [e] export this page, [q] quit: ").strip().lower()
+            if choice == 'e':
+                _export_page(export_path or f"{table_name}_page{page_number}.csv", selected_columns, rows)
+                choice = input("[Enter] next page, [q] quit: ").strip().lower()
+            if choice == 'q':
+                break
                 
+    except ValueError as e:
+        print(f"\n{e}")
     except sqlite3.Error as e:
         print(f"\nAn error occurred while querying the table: {e}")
     finally:
@@ -157,7 +313,39 @@ def view_tables_contents(table_name):
             conn.close()
 
 
+def inspect_table(argv=None):
+    """
+    Command-line table inspector.
+
+    Usage:
+        python create_database.py inspect transactions --columns date,amount --where "category=Food" --page-size 50
+    """
+    parser = argparse.ArgumentParser(prog="create_database.py inspect", description="Page through a table in constant memory.")
+    parser.add_argument("table", help="Table to inspect, e.g. transactions")
+    parser.add_argument("--columns", help="Comma-separated columns to display (default: all)")
+    parser.add_argument("--where", action="append", default=[], metavar="FILTER",
+                        help="Filter like 'category=Food', 'amount>=100' or 'description~rent' (repeatable)")
+    parser.add_argument("--page-size", type=int, default=20, help="Rows per page (default: 20)")
+    parser.add_argument("--household", help="Household database to open (default: finance.db)")
+    parser.add_argument("--export", metavar="CSV_PATH", help="File to export the current page to")
+    args = parser.parse_args(argv)
+
+    view_tables_contents(
+        args.table,
+        household=args.household,
+        columns=[column.strip() for column in args.columns.split(',')] if args.columns else None,
+        filters=args.where,
+        page_size=args.page_size,
+        interactive=sys.stdin.isatty(),
+        export_path=args.export,
+    )
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "inspect":
+        inspect_table(sys.argv[2:])
+        sys.exit()
+
     if os.path.exists(Database_File):
         print(f"Database file '{Database_File}' already exists.")
     else:
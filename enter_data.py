@@ -24,6 +24,9 @@ COLUMN_MAP = {
 
 # Set to True if your CSV file has a header row that should be skipped
 HAS_HEADER = True
+
+# 3. Household: Which household database to load into (None = the default 'finance.db')
+HOUSEHOLD = None
 # ---------------------
 
 def fetch_data_from_csv():
@@ -111,7 +114,7 @@ def main():
 
     # 2. Connect to the SQLite database
     # Requires finance_db.py to be in the same folder.
-    db_conn = finance_db.initialize_db()
+    db_conn = finance_db.initialize_db(HOUSEHOLD)
     
     if db_conn:
         # 3. Load data into the database
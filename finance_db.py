@@ -1,34 +1,75 @@
 import sqlite3
 import os
+import queue
+import re
+import threading
+import time
+
+import anomalies # Category statistics and anomaly scores are updated alongside every insert
+import recurring # Recurring-series state is updated alongside every insert
 
 DATABASE_NAME = 'finance.db'
 
-def initialize_db():
+# Each additional household is stored in its own database file inside this folder,
+# so a large household never shares locks, pages or query time with the others.
+HOUSEHOLDS_DIR = 'households'
+DEFAULT_HOUSEHOLD = 'default'
+
+
+def get_database_path(household=None):
+    """
+    Returns the database file for a household.
+
+    Args:
+        household (str): Household name. None or DEFAULT_HOUSEHOLD selects 'finance.db'.
+
+    Returns:
+        str: Path of the household's SQLite file.
+    """
+    if not household or household == DEFAULT_HOUSEHOLD:
+        return DATABASE_NAME
+
+    slug = re.sub(r'[^a-z0-9_-]+', '-', household.strip().lower()).strip('-')
+    if not slug or slug == DEFAULT_HOUSEHOLD:
+        raise ValueError(f"Invalid household name: '{household}'")
+    return os.path.join(HOUSEHOLDS_DIR, f"{slug}.db")
+
+
+def list_households():
+    """
+    Lists every household that has a database file.
+
+    Returns:
+        list: Household names, with DEFAULT_HOUSEHOLD first when 'finance.db' exists.
+    """
+    households = [DEFAULT_HOUSEHOLD] if os.path.exists(DATABASE_NAME) else []
+    if os.path.isdir(HOUSEHOLDS_DIR):
+        households += sorted(
+            filename[:-len('.db')] for filename in os.listdir(HOUSEHOLDS_DIR)
+            if filename.endswith('.db')
+        )
+    return households
+
+
+def initialize_db(household=None):
     """
     Establishes a connection to the SQLite database and ensures the necessary
     'transactions' table exists with the correct schema.
+
+    Args:
+        household (str): Household whose database to open (default: 'finance.db').
     
     Returns:
         sqlite3.Connection: The database connection object, or None if connection fails.
     """
-    print(f"Connecting to database: {DATABASE_NAME}")
+    database_path = get_database_path(household)
+    print(f"Connecting to database: {database_path}")
     try:
         # Connect to the database file (it will be created if it doesn't exist)
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-
-        # SQL to create the transactions table
-        create_table_sql = """
-        CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT NOT NULL,
-            description TEXT NOT NULL,
-            category TEXT NOT NULL,
-            amount REAL NOT NULL,
-            flow TEXT NOT NULL -- 'Income' or 'Expense'
-        );
-        """
-        cursor.execute(create_table_sql)
+        if os.path.dirname(database_path):
+            os.makedirs(os.path.dirname(database_path), exist_ok=True)
+        conn = sqlite3.connect(database_path)
+        ensure_schema(conn.cursor())
         conn.commit()
         print("✅ Database connection established and 'transactions' table ensured.")
         return conn
@@ -37,6 +78,58 @@ def initialize_db():
         print(f"❌ Database error during initialization: {e}")
         return None
 
+def ensure_schema(cursor):
+    """Creates the 'transactions' table and the derived state tables if they do not exist."""
+    # SQL to create the transactions table
+    create_table_sql = """
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        description TEXT NOT NULL,
+        category TEXT NOT NULL,
+        amount REAL NOT NULL,
+        flow TEXT NOT NULL -- 'Income' or 'Expense'
+    );
+    """
+    cursor.execute(create_table_sql)
+    ensure_derived_tables(cursor)
+
+
+def ensure_derived_tables(cursor):
+    """Creates the state tables maintained incrementally on every import."""
+    recurring.ensure_recurring_schema(cursor)
+    anomalies.ensure_anomaly_schema(cursor)
+
+
+def insert_transactions(cursor, transactions_data):
+    """
+    Inserts transactions and updates the derived state tables on the given
+    cursor, without committing.
+
+    Rows are inserted one statement at a time (the statement is compiled once
+    and cached) so each new transaction id can be handed to the anomaly scorer.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor of the importing connection.
+        transactions_data (list): Tuples of (date, description, category, amount, flow).
+
+    Returns:
+        int: Number of inserted transactions flagged as outliers.
+    """
+    insert_sql = """
+    INSERT INTO transactions (date, description, category, amount, flow)
+    VALUES (?, ?, ?, ?, ?);
+    """
+
+    inserted = []
+    for transaction in transactions_data:
+        cursor.execute(insert_sql, transaction)
+        inserted.append((cursor.lastrowid,) + tuple(transaction))
+
+    recurring.update_recurring_series(cursor, transactions_data)
+    return anomalies.score_transactions(cursor, inserted)
+
+
 def import_transactions(conn, transactions_data):
     """
     Inserts a list of financial transactions into the database.
@@ -51,23 +144,184 @@ def import_transactions(conn, transactions_data):
         print("❌ Cannot import data: Database connection is not available.")
         return
 
-    insert_sql = """
-    INSERT INTO transactions (date, description, category, amount, flow)
-    VALUES (?, ?, ?, ?, ?);
-    """
-    
     try:
         cursor = conn.cursor()
-        # Execute the INSERT statement for all records at once for efficiency
-        cursor.executemany(insert_sql, transactions_data)
+        # Insert all records and update the derived tables in a single transaction
+        flagged = insert_transactions(cursor, transactions_data)
         conn.commit()
         print(f"🎉 Successfully imported {len(transactions_data)} transactions into the database.")
+        if flagged:
+            print(f"⚠️ {flagged} imported transactions look unusual for their category.")
     
     except sqlite3.Error as e:
         print(f"❌ Database error during data insertion: {e}")
         print("Rolling back changes...")
         conn.rollback()
 
+class TransactionWriter:
+    """
+    Write-behind queue for interactive data entry.
+
+    Submitted transactions are placed on an in-process queue and drained by a
+    background thread that owns its own database connection. Rows are grouped
+    into a single commit whenever `batch_size` rows are waiting or
+    `flush_interval_ms` has elapsed since the first queued row, so callers
+    never block on disk writes and bursts of entries share a few commits.
+
+    A batch that fails to commit is retried one row at a time. Rows that fail
+    with sqlite3.OperationalError (locked or busy database, disk errors) are
+    kept in `unsaved` and retried with the next batch; rows that fail for any
+    other reason (constraint violations, bad values) would fail every time, so
+    they are set aside in `rejected` as (row, error) pairs instead of blocking
+    later entries. `last_error` and `is_alive()` report problems to the caller.
+    """
+
+    def __init__(self, database_name=DATABASE_NAME, batch_size=50, flush_interval_ms=250, retry_delay_ms=1000):
+        self.database_name = database_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.retry_delay = retry_delay_ms / 1000.0
+        self.written = 0
+        self.unsaved = []
+        self.rejected = []
+        self.last_error = None
+        self._failed = threading.Event()
+        self._queue = queue.Queue()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="TransactionWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, transaction):
+        """
+        Queues a single transaction for insertion without waiting for the commit.
+
+        Args:
+            transaction (tuple): (date, description, category, amount, flow).
+        """
+        if self._stopping.is_set():
+            raise RuntimeError("TransactionWriter has been stopped.")
+        if not self.is_alive():
+            raise RuntimeError(f"TransactionWriter is not running: {self.last_error}")
+        self._queue.put(transaction)
+
+    def is_alive(self):
+        """Returns True while the background thread is running and able to write."""
+        return self._thread.is_alive() and not self._failed.is_set()
+
+    def pending(self):
+        """Returns the approximate number of transactions waiting to be written, including failed ones."""
+        return self._queue.qsize() + len(self.unsaved)
+
+    def stop(self, timeout=None):
+        """Flushes any queued transactions and stops the background thread."""
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    def _collect_batch(self):
+        """Blocks for the first row, then gathers more until the batch is full or the interval expires."""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _insert(self, conn, rows):
+        """Inserts rows and updates the derived tables in one commit; rolls back and re-raises on error."""
+        try:
+            insert_transactions(conn.cursor(), rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self.written += len(rows)
+
+    def _write_batch(self, conn, batch):
+        """
+        Inserts a batch of rows as one group commit, falling back to one row at
+        a time when the batch fails.
+
+        Returns:
+            list: Rows that hit a transient error and should be retried later.
+        """
+        try:
+            self._insert(conn, batch)
+            self.last_error = None
+            return []
+        except Exception as e:
+            self.last_error = e
+            print(f"❌ Error during queued insertion of {len(batch)} transactions, retrying row by row: {e}")
+
+        retry = []
+        for index, row in enumerate(batch):
+            try:
+                self._insert(conn, [row])
+            except sqlite3.OperationalError as e:
+                # The database itself is unavailable; keep this and the remaining rows for later
+                self.last_error = e
+                retry = batch[index:]
+                break
+            except Exception as e:
+                self.last_error = e
+                self.rejected.append((row, e))
+                print(f"❌ Rejected queued transaction {row}: {e}")
+        return retry
+
+    def _open(self):
+        """Opens the writer's connection and ensures the full schema; marks the writer failed on error."""
+        try:
+            if os.path.dirname(self.database_name):
+                os.makedirs(os.path.dirname(self.database_name), exist_ok=True)
+            conn = sqlite3.connect(self.database_name)
+            ensure_schema(conn.cursor())
+            conn.commit()
+            return conn
+        except (sqlite3.Error, OSError) as e:
+            self.last_error = e
+            self._failed.set()
+            print(f"❌ TransactionWriter could not open '{self.database_name}': {e}")
+            return None
+
+    def _run(self):
+        """Background loop: drains the queue until stopped, retrying failed batches."""
+        conn = self._open()
+        if conn is None:
+            # Rows accepted before the failure was noticed stay visible in `unsaved`
+            while not self._queue.empty():
+                self.unsaved.append(self._queue.get_nowait())
+            return
+
+        try:
+            while True:
+                # Read before collecting, so a stop request still drains the queue once more
+                stopping = self._stopping.is_set()
+                rows = self.unsaved + self._collect_batch()
+                if rows:
+                    self.unsaved = self._write_batch(conn, rows)
+                    if self.unsaved:
+                        if stopping:
+                            break
+                        time.sleep(self.retry_delay)
+                elif stopping:
+                    break
+        finally:
+            # Anything still queued after a failed final attempt stays visible in `unsaved`
+            while not self._queue.empty():
+                self.unsaved.append(self._queue.get_nowait())
+            if self.unsaved:
+                print(f"⚠️ TransactionWriter stopped with {len(self.unsaved)} unsaved transactions.")
+            conn.close()
+
+
 def close_db(conn):
     """
     Closes the database connection.
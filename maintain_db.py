@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Routine maintenance for the finance databases.
+
+For every household database this script checks integrity, reclaims free
+pages with an incremental vacuum, refreshes the query planner statistics
+(ANALYZE / PRAGMA optimize) and checkpoints the write-ahead log, then reports
+the file size and dashboard query timings before and after.
+
+The database is switched to WAL journaling so the dashboard keeps reading
+while maintenance writes, and every step waits on locks (busy timeout)
+instead of failing, which makes it safe to run while the app is serving.
+
+Usage:
+    python maintain_db.py
+"""
+
+import os
+import sqlite3
+import time
+
+from analyzer import fetch_financial_summary, fetch_monthly_trends, fetch_category_spending, fetch_all_transactions
+from finance_db import DEFAULT_HOUSEHOLD, get_database_path, list_households
+
+# How long each statement waits for a lock held by the dashboard or an import
+BUSY_TIMEOUT_SECONDS = 10
+
+# SQLite's value for PRAGMA auto_vacuum = INCREMENTAL
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Dashboard queries timed before and after maintenance
+TIMED_QUERIES = {
+    'summary': fetch_financial_summary,
+    'monthly_trends': fetch_monthly_trends,
+    'category_spending': lambda conn: fetch_category_spending(conn, flow='Expense'),
+    'transactions': lambda conn: fetch_all_transactions(conn, limit=500),
+}
+
+
+def _database_size(database_path):
+    """Returns the on-disk size of the database including its WAL file, in bytes."""
+    return sum(
+        os.path.getsize(path)
+        for path in (database_path, database_path + '-wal')
+        if os.path.exists(path)
+    )
+
+
+def _time_queries(conn):
+    """Runs each dashboard query once and returns its duration in milliseconds."""
+    timings = {}
+    for name, run_query in TIMED_QUERIES.items():
+        started = time.perf_counter()
+        run_query(conn)
+        timings[name] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def _freelist_ratio(conn):
+    """Returns (free pages, total pages, free page ratio)."""
+    page_count = conn.execute("PRAGMA page_count;").fetchone()[0]
+    freelist_count = conn.execute("PRAGMA freelist_count;").fetchone()[0]
+    return freelist_count, page_count, (freelist_count / page_count if page_count else 0.0)
+
+
+def maintain_database(household=None):
+    """
+    Runs integrity checks, space reclamation, statistics refresh and a WAL
+    checkpoint on one household database.
+
+    Args:
+        household (str): Household to maintain (default: 'finance.db').
+
+    Returns:
+        dict: Maintenance report, or None if the database could not be opened.
+    """
+    database_path = get_database_path(household)
+    if not os.path.exists(database_path):
+        print(f"❌ Error: Database file '{database_path}' not found.")
+        return None
+
+    print(f"\n--- Maintaining {database_path} ---")
+    conn = None
+    try:
+        # Autocommit mode: VACUUM and the PRAGMAs below cannot run inside a transaction
+        conn = sqlite3.connect(database_path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+        report = {
+            'database': database_path,
+            'size_before': _database_size(database_path),
+            'timings_before': _time_queries(conn),
+        }
+
+        # 1. Integrity: never rewrite a damaged file
+        problems = [row[0] for row in conn.execute("PRAGMA integrity_check;").fetchall()]
+        report['integrity'] = problems
+        if problems != ['ok']:
+            print(f"❌ Integrity check failed, skipping maintenance: {problems[:5]}")
+            return report
+        print("✅ Integrity check passed.")
+
+        # 2. WAL journaling lets dashboard readers continue while maintenance writes
+        report['journal_mode'] = conn.execute("PRAGMA journal_mode=WAL;").fetchone()[0]
+
+        # 3. Reclaim free pages
+        free_pages, total_pages, ratio = _freelist_ratio(conn)
+        report['freelist_before'] = ratio
+        print(f"Free pages: {free_pages} of {total_pages} ({ratio:.1%}).")
+
+        if conn.execute("PRAGMA auto_vacuum;").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            # One-time conversion; afterwards space is reclaimed incrementally
+            conn.execute(f"PRAGMA auto_vacuum={AUTO_VACUUM_INCREMENTAL};")
+            conn.execute("VACUUM;")
+            print("✅ Enabled incremental auto-vacuum (full VACUUM performed once).")
+        elif free_pages:
+            # The pragma frees one page per step and sqlite3's execute() stops after the
+            # first step; executescript() steps it to completion
+            conn.executescript("PRAGMA incremental_vacuum;")
+
+        free_pages_after, _, report['freelist_after'] = _freelist_ratio(conn)
+        if free_pages > free_pages_after:
+            print(f"✅ Released {free_pages - free_pages_after} free pages.")
+
+        # 4. Planner statistics
+        conn.execute("ANALYZE;")
+        conn.execute("PRAGMA optimize;")
+        print("✅ Planner statistics refreshed (ANALYZE, PRAGMA optimize).")
+
+        # 5. Fold the WAL back into the main file so finance.db is complete on its own
+        busy, wal_frames, checkpointed = conn.execute("PRAGMA wal_checkpoint(TRUNCATE);").fetchone()
+        report['checkpoint'] = {'busy': bool(busy), 'wal_frames': wal_frames, 'checkpointed': checkpointed}
+        if busy:
+            print("⚠️ WAL checkpoint was blocked by an active reader; it will complete on a later run.")
+        else:
+            print(f"✅ WAL checkpoint complete ({checkpointed} frames).")
+
+        report['size_after'] = _database_size(database_path)
+        report['timings_after'] = _time_queries(conn)
+        _print_report(report)
+        return report
+
+    except sqlite3.Error as e:
+        print(f"❌ Database error during maintenance: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+
+def _print_report(report):
+    """Prints the before/after comparison of a maintenance run."""
+    print(f"\nFile size: {report['size_before']:,} -> {report['size_after']:,} bytes")
+    print("{:<20} {:>12} {:>12}".format("Query", "Before (ms)", "After (ms)"))
+    print("-" * 46)
+    for name, before in report['timings_before'].items():
+        print("{:<20} {:>12.2f} {:>12.2f}".format(name, before, report['timings_after'][name]))
+
+
+if __name__ == '__main__':
+    for household_name in list_households() or [DEFAULT_HOUSEHOLD]:
+        maintain_database(household_name)
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental detector for recurring transactions (paychecks, rent, card payments).
+
+Transactions are grouped into series by normalized description, flow and
+amount: a transaction joins the series whose typical amount is within
+AMOUNT_BAND_TOLERANCE of it, and starts a new amount band only when none is
+close enough. Each series keeps running state in the 'recurring_series' table
+(occurrences, first and last date, mean interval) and its distinct dates in
+'recurring_series_dates', both updated from every import
+batch in the same database transaction as the insert, so detection never
+re-scans the full history. Running this script rebuilds the table from the
+existing transactions (backfill).
+
+Usage:
+    python recurring.py
+"""
+
+import math
+import re
+import sqlite3
+from datetime import date, datetime, timedelta
+
+import finance_db # Imported as a module: finance_db calls back into this one on every import
+
+# A transaction joins a series whose typical amount is within this relative distance
+AMOUNT_BAND_TOLERANCE = 0.15
+
+# A series needs this many occurrences before its cadence is reported
+MIN_OCCURRENCES = 2
+
+# Cadence name -> (minimum, maximum) mean interval in days
+CADENCES = {
+    'weekly': (6, 8),
+    'biweekly': (13, 16),
+    'monthly': (27, 33),
+    'quarterly': (85, 95),
+    'yearly': (355, 375),
+}
+
+# Rows read per batch when backfilling from the transactions table
+BACKFILL_BATCH_SIZE = 5000
+
+
+def ensure_recurring_schema(cursor):
+    """Creates the 'recurring_series' and 'recurring_series_dates' state tables if they do not exist."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS recurring_series (
+        series_key TEXT PRIMARY KEY,       -- normalized description | flow | amount band
+        description TEXT NOT NULL,         -- most recent raw description
+        category TEXT NOT NULL,
+        flow TEXT NOT NULL,
+        typical_amount REAL NOT NULL,      -- running mean of the amounts
+        occurrences INTEGER NOT NULL,
+        first_date TEXT NOT NULL,          -- YYYY-MM-DD
+        last_date TEXT NOT NULL,           -- YYYY-MM-DD
+        interval_count INTEGER NOT NULL DEFAULT 0, -- distinct dates minus one
+        mean_interval_days REAL,
+        cadence TEXT,                      -- see CADENCES, NULL while unknown/irregular
+        next_expected_date TEXT            -- YYYY-MM-DD
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS recurring_series_dates (
+        series_key TEXT NOT NULL,
+        date TEXT NOT NULL,                -- YYYY-MM-DD
+        PRIMARY KEY (series_key, date)
+    ) WITHOUT ROWID;
+    """)
+
+
+def normalize_description(description):
+    """Lowercases a description and strips digits and punctuation (e.g. check or invoice numbers)."""
+    text = re.sub(r'[^a-z ]+', ' ', description.lower())
+    return ' '.join(text.split())
+
+
+def amount_band(amount):
+    """Maps an amount to a logarithmic band; used to key a new series when no existing one matches."""
+    amount = abs(amount)
+    if amount < 1:
+        return 0
+    return int(round(math.log(amount) / math.log(1 + AMOUNT_BAND_TOLERANCE)))
+
+
+def _within_tolerance(amount, typical_amount):
+    """True when two amounts differ by at most AMOUNT_BAND_TOLERANCE of the larger one."""
+    larger = max(abs(amount), abs(typical_amount), 1)
+    return abs(abs(amount) - abs(typical_amount)) <= AMOUNT_BAND_TOLERANCE * larger
+
+
+def _find_series_key(cursor, description, flow, amount):
+    """
+    Returns the key of the series a transaction belongs to.
+
+    Picks the series with the same normalized description and flow whose
+    typical amount is closest to the transaction's and within tolerance, so
+    amounts on either side of a band boundary stay together. Without a match
+    the key of the transaction's own amount band is returned.
+    """
+    prefix = f"{normalize_description(description)}|{flow}|"
+    # Key range of every band for this description and flow ('}' sorts right after '|'), served by the primary key
+    cursor.execute(
+        "SELECT series_key, typical_amount FROM recurring_series WHERE series_key >= ? AND series_key < ?;",
+        (prefix, prefix[:-1] + '}')
+    )
+    candidates = [(key, typical_amount) for key, typical_amount in cursor.fetchall() if _within_tolerance(amount, typical_amount)]
+    if candidates:
+        return min(candidates, key=lambda candidate: abs(abs(amount) - abs(candidate[1])))[0]
+    return f"{prefix}{amount_band(amount)}"
+
+
+def parse_date(text):
+    """Parses the MM/DD/YYYY dates from enter_data.py (and ISO dates); returns None if unrecognized."""
+    for date_format in ('%m/%d/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(text.strip(), date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _add_months(day, months):
+    """Adds calendar months, clamping the day to the length of the target month."""
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    return date(year, month, min(day.day, (next_month - timedelta(days=1)).day))
+
+
+def classify_cadence(mean_interval_days):
+    """Returns the cadence whose interval window contains the mean interval, or None."""
+    if mean_interval_days is None:
+        return None
+    for cadence, (low, high) in CADENCES.items():
+        if low <= mean_interval_days <= high:
+            return cadence
+    return None
+
+
+def next_expected_date(last_date, cadence, mean_interval_days):
+    """Projects the next occurrence: calendar months for monthly+ cadences, days otherwise."""
+    months = {'monthly': 1, 'quarterly': 3, 'yearly': 12}.get(cadence)
+    if months:
+        return _add_months(last_date, months)
+    return last_date + timedelta(days=round(mean_interval_days))
+
+
+def update_recurring_series(cursor, transactions):
+    """
+    Folds a batch of new transactions into the recurring series state.
+
+    Runs on the caller's cursor and does not commit, so the state update lands
+    in the same transaction as the insert it describes.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor of the importing connection.
+        transactions (list): Tuples of (date, description, category, amount, flow).
+    """
+    parsed = []
+    for transaction_date, description, category, amount, flow in transactions:
+        day = parse_date(transaction_date)
+        if day is not None:
+            parsed.append((day, description, category, float(amount), flow))
+
+    for day, description, category, amount, flow in sorted(parsed, key=lambda row: row[0]):
+        key = _find_series_key(cursor, description, flow, amount)
+        cursor.execute("""
+            SELECT typical_amount, occurrences, first_date, last_date, interval_count, mean_interval_days
+            FROM recurring_series WHERE series_key = ?;
+        """, (key,))
+        state = cursor.fetchone()
+
+        # Gaps are only counted for dates the series has not seen, so re-importing a statement changes nothing
+        cursor.execute(
+            "INSERT OR IGNORE INTO recurring_series_dates (series_key, date) VALUES (?, ?);",
+            (key, day.isoformat())
+        )
+        is_new_date = cursor.rowcount == 1
+
+        if state is None:
+            cursor.execute("""
+                INSERT INTO recurring_series
+                    (series_key, description, category, flow, typical_amount, occurrences, first_date, last_date)
+                VALUES (?, ?, ?, ?, ?, 1, ?, ?);
+            """, (key, description, category, flow, amount, day.isoformat(), day.isoformat()))
+            continue
+
+        typical_amount, occurrences, first_date, last_date, interval_count, mean_interval = state
+        first_date = date.fromisoformat(first_date)
+        last_date = date.fromisoformat(last_date)
+
+        occurrences += 1
+        typical_amount += (amount - typical_amount) / occurrences
+
+        if is_new_date:
+            interval_count += 1
+        first_date = min(first_date, day)
+        last_date = max(last_date, day)
+
+        # Derived from the span, so back-dated rows give the same result as a backfill
+        mean_interval = (last_date - first_date).days / interval_count if interval_count else None
+
+        cadence = classify_cadence(mean_interval) if occurrences >= MIN_OCCURRENCES else None
+        next_date = next_expected_date(last_date, cadence, mean_interval) if cadence else None
+
+        cursor.execute("""
+            UPDATE recurring_series
+            SET description = ?, category = ?, typical_amount = ?, occurrences = ?,
+                first_date = ?, last_date = ?, interval_count = ?, mean_interval_days = ?,
+                cadence = ?, next_expected_date = ?
+            WHERE series_key = ?;
+        """, (
+            description, category, typical_amount, occurrences,
+            first_date.isoformat(), last_date.isoformat(), interval_count, mean_interval,
+            cadence, next_date.isoformat() if next_date else None, key,
+        ))
+
+
+def rebuild_recurring_series(household=None):
+    """
+    Backfills the 'recurring_series' table from a household's full transaction history.
+
+    Args:
+        household (str): Household database to rebuild (default: 'finance.db').
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(finance_db.get_database_path(household))
+        cursor = conn.cursor()
+        ensure_recurring_schema(cursor)
+        cursor.execute("DELETE FROM recurring_series;")
+        cursor.execute("DELETE FROM recurring_series_dates;")
+
+        # Stream the history in chronological order (MM/DD/YYYY reordered to sort correctly)
+        reader = conn.cursor()
+        reader.execute("""
+            SELECT date, description, category, amount, flow FROM transactions
+            ORDER BY CASE WHEN date LIKE '__/__/____'
+                          THEN substr(date, 7, 4) || '-' || substr(date, 1, 2) || '-' || substr(date, 4, 2)
+                          ELSE date END;
+        """)
+        while True:
+            batch = reader.fetchmany(BACKFILL_BATCH_SIZE)
+            if not batch:
+                break
+            update_recurring_series(cursor, batch)
+
+        conn.commit()
+        cursor.execute("SELECT COUNT(*) FROM recurring_series WHERE cadence IS NOT NULL;")
+        print(f"✅ Recurring series rebuilt for {finance_db.get_database_path(household)}: {cursor.fetchone()[0]} recurring.")
+
+    except sqlite3.Error as e:
+        print(f"❌ Database error while rebuilding recurring series: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    for household_name in finance_db.list_households() or [finance_db.DEFAULT_HOUSEHOLD]:
+        rebuild_recurring_series(household_name)
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Builds and loads a precomputed dashboard snapshot.
+
+Running this script executes every analyzer aggregation once against each
+household database ('finance.db' for the default household) and writes the
+results to a compact columnar JSON bundle.
+When the bundle is present, app.py renders the dashboard from it without
+issuing any SQL, so the hosted deployment only needs the snapshot file.
+
+Usage:
+    python snapshot.py
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from analyzer import (
+    get_db_connection,
+    fetch_financial_summary,
+    fetch_monthly_trends,
+    fetch_category_spending,
+    fetch_all_transactions,
+    fetch_household_summaries,
+    fetch_upcoming_bills,
+    fetch_missed_payments,
+    fetch_transaction_anomalies,
+)
+from finance_db import DEFAULT_HOUSEHOLD, HOUSEHOLDS_DIR, get_database_path, list_households
+
+SNAPSHOT_FILE = 'dashboard_snapshot.json'
+
+# Bump SNAPSHOT_FORMAT whenever the frame set or what a frame contains changes; bundles in
+# another format, or missing any of REQUIRED_FRAMES, are ignored so the app falls back to live queries.
+SNAPSHOT_FORMAT = 5
+REQUIRED_FRAMES = (
+    'summary', 'monthly_trends', 'category_spending', 'transactions', 'household_summaries',
+    'upcoming_bills', 'missed_payments', 'anomalies',
+)
+
+# Matches the upper bound of the "Number of transactions to display" slider in app.py
+SNAPSHOT_TRANSACTION_LIMIT = 500
+
+
+def get_snapshot_path(household=None):
+    """Returns the snapshot file for a household, stored next to its database file."""
+    if not household or household == DEFAULT_HOUSEHOLD:
+        return SNAPSHOT_FILE
+    slug = os.path.splitext(os.path.basename(get_database_path(household)))[0]
+    return os.path.join(HOUSEHOLDS_DIR, f"{slug}_snapshot.json")
+
+
+def _frame_to_columns(df):
+    """Converts a DataFrame into a column-oriented dict that is JSON serializable."""
+    return {
+        'columns': list(df.columns),
+        'data': {column: df[column].tolist() for column in df.columns},
+    }
+
+
+def _columns_to_frame(payload):
+    """Rebuilds a DataFrame from the output of _frame_to_columns."""
+    return pd.DataFrame(payload['data'], columns=payload['columns'])
+
+
+def _version_hash(frames):
+    """Returns a short content hash used to identify and validate a snapshot."""
+    encoded = json.dumps(frames, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def build_snapshot(household=None, output_filename=None, transaction_limit=SNAPSHOT_TRANSACTION_LIMIT,
+                   household_summaries=None):
+    """
+    Runs all dashboard aggregations once and writes them to a snapshot file.
+
+    Args:
+        household (str): Household to snapshot (default: 'finance.db').
+        output_filename (str): Path of the JSON bundle to write
+                               (default: get_snapshot_path(household)).
+        transaction_limit (int): Number of most recent transactions to include
+                                 for the Transaction Detail Viewer.
+        household_summaries (pd.DataFrame): Precomputed cross-household summary,
+                                            so snapshotting every household
+                                            computes it only once.
+
+    Returns:
+        str: The version hash of the written snapshot, or None on failure.
+    """
+    output_filename = output_filename or get_snapshot_path(household)
+    if household_summaries is None:
+        household_summaries = fetch_household_summaries()
+
+    conn = get_db_connection(household)
+    if not conn:
+        return None
+
+    try:
+        frames = {
+            'summary': _frame_to_columns(fetch_financial_summary(conn)),
+            'monthly_trends': _frame_to_columns(fetch_monthly_trends(conn)),
+            'category_spending': _frame_to_columns(fetch_category_spending(conn, flow='Expense')),
+            'transactions': _frame_to_columns(fetch_all_transactions(conn, limit=transaction_limit)),
+            'household_summaries': _frame_to_columns(household_summaries),
+            # Relative to the build date; rebuild the snapshot to move the window forward
+            'upcoming_bills': _frame_to_columns(fetch_upcoming_bills(conn)),
+            'missed_payments': _frame_to_columns(fetch_missed_payments(conn)),
+            'anomalies': _frame_to_columns(fetch_transaction_anomalies(conn, flow='Expense')),
+        }
+    finally:
+        conn.close()
+
+    version = _version_hash(frames)
+    bundle = {
+        'format': SNAPSHOT_FORMAT,
+        'version': version,
+        'built_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'frames': frames,
+    }
+
+    try:
+        with open(output_filename, mode='w', encoding='utf-8') as snapshot_file:
+            json.dump(bundle, snapshot_file, separators=(',', ':'), default=str)
+    except OSError as e:
+        print(f"❌ Error writing snapshot: {e}")
+        return None
+
+    print(f"🎉 Snapshot {version} written to: **{output_filename}**")
+    return version
+
+
+def load_snapshot(household=None, filename=None):
+    """
+    Loads a snapshot written by build_snapshot.
+
+    Args:
+        household (str): Household whose snapshot to read (default: 'finance.db').
+        filename (str): Path of the JSON bundle to read
+                        (default: get_snapshot_path(household)).
+
+    Returns:
+        dict: Mapping of frame name to DataFrame plus the 'version' and
+              'built_at' metadata, or None if the file is missing, from an
+              unknown format, missing a required frame, or fails its
+              version hash check.
+    """
+    filename = filename or get_snapshot_path(household)
+    if not os.path.exists(filename):
+        return None
+
+    try:
+        with open(filename, mode='r', encoding='utf-8') as snapshot_file:
+            bundle = json.load(snapshot_file)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error reading snapshot: {e}")
+        return None
+
+    if bundle.get('format') != SNAPSHOT_FORMAT:
+        print(f"⚠️ Ignoring snapshot '{filename}': unsupported format {bundle.get('format')}.")
+        return None
+
+    frames = bundle.get('frames', {})
+    missing = [name for name in REQUIRED_FRAMES if name not in frames]
+    if missing:
+        print(f"⚠️ Ignoring snapshot '{filename}': missing frames {', '.join(missing)}.")
+        return None
+
+    if _version_hash(frames) != bundle.get('version'):
+        print(f"⚠️ Ignoring snapshot '{filename}': version hash does not match its contents.")
+        return None
+
+    snapshot = {name: _columns_to_frame(payload) for name, payload in frames.items()}
+    snapshot['version'] = bundle['version']
+    snapshot['built_at'] = bundle.get('built_at')
+    return snapshot
+
+
+def filter_transactions(transactions_df, category=None, flow=None, limit=50):
+    """
+    Applies the Transaction Detail Viewer filters to snapshot transactions.
+
+    Unlike analyzer.fetch_all_transactions, which filters the whole table,
+    this only filters the SNAPSHOT_TRANSACTION_LIMIT most recent transactions
+    captured in the snapshot, so rarer categories may show fewer rows.
+    """
+    if transactions_df.empty:
+        return transactions_df
+
+    df = transactions_df
+    if category:
+        df = df[df['category'] == category]
+    if flow:
+        df = df[df['flow'] == flow]
+    return df.head(limit).reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    # Snapshot every household; the household summaries are computed once and included in each bundle
+    all_household_summaries = fetch_household_summaries()
+    for household_name in list_households() or [DEFAULT_HOUSEHOLD]:
+        build_snapshot(household_name, household_summaries=all_household_summaries)